@@ -13,6 +13,47 @@ from datetime import datetime
 from pathlib import Path
 import argparse
 
+# Columns produced by _parse_fls_output (fls -m body format)
+FLS_FIELDS = ["type", "inode", "name", "mode", "uid", "gid", "size", "atime", "mtime", "ctime"]
+
+
+class FileEntry:
+    """A single file record from the fls listing
+    
+    Uses __slots__ rather than a dict per file, which matters on images
+    with hundreds of thousands of files.
+    """
+    
+    __slots__ = FLS_FIELDS
+    
+    def __init__(self, type, inode, name, mode, uid, gid, size, atime, mtime, ctime=""):
+        self.type = type
+        self.inode = inode
+        self.name = name
+        self.mode = mode
+        self.uid = uid
+        self.gid = gid
+        self.size = size
+        self.atime = atime
+        self.mtime = mtime
+        self.ctime = ctime
+    
+    def as_dict(self):
+        """Return the record as a plain dict (for JSON output)"""
+        return {field: getattr(self, field) for field in FLS_FIELDS}
+    
+    def as_row(self):
+        """Return the record as a list in FLS_FIELDS order (for CSV output)"""
+        return [getattr(self, field) for field in FLS_FIELDS]
+
+
+def _json_default(obj):
+    """json.dump hook for record types that aren't plain dicts"""
+    if isinstance(obj, FileEntry):
+        return obj.as_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
 class ForensicToolkit:
     """Main class for the automated forensic toolkit"""
     
@@ -26,18 +67,20 @@ class ForensicToolkit:
             "image_analyzed": str(image_path),
             "artifacts": {}
         }
+        # istat output per inode for repeated metadata lookups from the menu
+        self._istat_cache = {}
     
-    def run_command(self, cmd):
-        """Execute a shell command and return output"""
+    def run_command(self, cmd, stdout=subprocess.PIPE):
+        """Execute a command (an argument list, no shell) and return output"""
         try:
             result = subprocess.run(
                 cmd,
-                shell=True,
-                capture_output=True,
+                stdout=stdout,
+                stderr=subprocess.PIPE,
                 text=True,
                 timeout=300
             )
-            return result.stdout, result.stderr, result.returncode
+            return result.stdout or "", result.stderr, result.returncode
         except subprocess.TimeoutExpired:
             return "", "Command timed out", -1
         except Exception as e:
@@ -46,7 +89,7 @@ class ForensicToolkit:
     def analyze_filesystem(self):
         """Analyze filesystem structure using fsstat"""
         print("[*] Analyzing filesystem structure...")
-        cmd = f"fsstat {self.image_path}"
+        cmd = ["fsstat", str(self.image_path)]
         stdout, stderr, code = self.run_command(cmd)
         
         if code == 0:
@@ -68,8 +111,8 @@ class ForensicToolkit:
     def list_files(self, recursive=True):
         """List all files using fls"""
         print("[*] Extracting file listing...")
-        flag = "-r" if recursive else ""
-        cmd = f"fls {flag} -m / {self.image_path}"
+        flags = ["-r"] if recursive else []
+        cmd = ["fls", *flags, "-m", "/", str(self.image_path)]
         stdout, stderr, code = self.run_command(cmd)
         
         if code == 0:
@@ -98,27 +141,23 @@ class ForensicToolkit:
                 continue
             parts = line.split('|')
             if len(parts) >= 10:
-                files.append({
-                    "type": parts[1],
-                    "inode": parts[2],
-                    "name": parts[3],
-                    "mode": parts[4],
-                    "uid": parts[5],
-                    "gid": parts[6],
-                    "size": parts[7],
-                    "atime": parts[8],
-                    "mtime": parts[9],
-                    "ctime": parts[10] if len(parts) > 10 else ""
-                })
+                files.append(FileEntry(*parts[1:10], parts[10] if len(parts) > 10 else ""))
         return files
     
     def analyze_file_metadata(self, inode):
         """Get detailed metadata for a specific file using istat"""
         print(f"[*] Analyzing metadata for inode {inode}...")
-        cmd = f"istat {self.image_path} {inode}"
+        inode = str(inode)
+        # The image is read-only evidence, so an inode's metadata never changes
+        if inode in self._istat_cache:
+            print(f"[✓] Metadata extracted for inode {inode} (cached)")
+            return self._istat_cache[inode]
+        
+        cmd = ["istat", str(self.image_path), inode]
         stdout, stderr, code = self.run_command(cmd)
         
         if code == 0:
+            self._istat_cache[inode] = stdout
             print(f"[✓] Metadata extracted for inode {inode}")
             return stdout
         else:
@@ -128,7 +167,7 @@ class ForensicToolkit:
     def extract_deleted_files(self):
         """Find deleted files"""
         print("[*] Searching for deleted files...")
-        cmd = f"fls -r -d {self.image_path}"
+        cmd = ["fls", "-r", "-d", str(self.image_path)]
         stdout, stderr, code = self.run_command(cmd)
         
         if code == 0:
@@ -152,17 +191,19 @@ class ForensicToolkit:
     def create_timeline(self):
         """Generate filesystem timeline using fls"""
         print("[*] Creating filesystem timeline...")
-        cmd = f"fls -r -m / {self.image_path}"
+        cmd = ["fls", "-r", "-m", "/", str(self.image_path)]
         stdout, stderr, code = self.run_command(cmd)
         
         if code == 0:
-            timeline_entries = stdout.strip().split('\n')
+            # fls terminates every entry with a newline, so counting them is
+            # enough - no need to split the whole output into a list
+            entries = stdout.count('\n')
             self.results["artifacts"]["timeline"] = {
-                "entries": len(timeline_entries),
+                "entries": entries,
                 "status": "success"
             }
             self._save_text_output("timeline.txt", stdout)
-            print(f"[✓] Timeline created with {len(timeline_entries)} entries")
+            print(f"[✓] Timeline created with {entries} entries")
         else:
             print(f"[✗] Timeline creation failed: {stderr}")
             self.results["artifacts"]["timeline"] = {
@@ -173,7 +214,7 @@ class ForensicToolkit:
     def analyze_partitions(self):
         """Analyze disk partitions using mmls"""
         print("[*] Analyzing disk partitions...")
-        cmd = f"mmls {self.image_path}"
+        cmd = ["mmls", str(self.image_path)]
         stdout, stderr, code = self.run_command(cmd)
         
         if code == 0:
@@ -216,8 +257,12 @@ class ForensicToolkit:
         output_path = self.output_dir / "recovered" / output_filename
         output_path.parent.mkdir(exist_ok=True)
         
-        cmd = f"icat {self.image_path} {inode} > {output_path}"
-        stdout, stderr, code = self.run_command(cmd)
+        cmd = ["icat", str(self.image_path), str(inode)]
+        try:
+            with open(output_path, 'wb') as f:
+                stdout, stderr, code = self.run_command(cmd, stdout=f)
+        except OSError as e:
+            stdout, stderr, code = "", str(e), -1
         
         if code == 0:
             print(f"[✓] File recovered to {output_path}")
@@ -238,7 +283,11 @@ class ForensicToolkit:
             return
         filepath = self.output_dir / f"{self.timestamp}_{filename}"
         with open(filepath, 'w', newline='') as f:
-            if isinstance(data[0], dict):
+            if isinstance(data[0], FileEntry):
+                writer = csv.writer(f)
+                writer.writerow(FLS_FIELDS)
+                writer.writerows(entry.as_row() for entry in data)
+            elif isinstance(data[0], dict):
                 writer = csv.DictWriter(f, fieldnames=data[0].keys())
                 writer.writeheader()
                 writer.writerows(data)
@@ -247,7 +296,7 @@ class ForensicToolkit:
         """Save complete analysis results as JSON"""
         filepath = self.output_dir / f"{self.timestamp}_forensic_report.json"
         with open(filepath, 'w') as f:
-            json.dump(self.results, f, indent=2)
+            json.dump(self.results, f, indent=2, default=_json_default)
         print(f"\n[✓] JSON report saved to {filepath}")
     
     def run_full_analysis(self):
@@ -5,434 +5,390 @@ A user-friendly interface for digital forensics analysis
 """
 
 import subprocess
+import html
 import json
 import csv
+import functools
 import os
+import queue
+import stat
 import sys
+import threading
+from contextlib import nullcontext, redirect_stdout
 from datetime import datetime
 from pathlib import Path
-import argparse
 
-class ForensicToolkit:
-    """Main class for the automated forensic toolkit"""
+
+@functools.lru_cache(maxsize=1)
+def _load_orjson():
+    """Import orjson on first use, or return None if it isn't installed
     
-    def __init__(self, image_path, output_dir="forensic_output"):
-        self.image_path = image_path
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
-        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.results = {
-            "analysis_date": datetime.now().isoformat(),
-            "image_analyzed": str(image_path),
-            "artifacts": {}
-        }
+    orjson is optional; it is much faster than the stdlib encoder on large
+    reports. It is only needed once a report is written, so --help and
+    argument errors don't pay for loading it.
+    """
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+# Escapes text taken from the image (file names, labels) before it goes into HTML.
+# html.escape's chained str.replace calls are faster than a str.translate
+# table on short names with nothing to escape, which is nearly every row.
+_esc = html.escape
+
+# Columns produced by _parse_fls_line (fls -m body format)
+FLS_FIELDS = ["type", "inode", "name", "mode", "uid", "gid", "size", "atime", "mtime", "ctime"]
+
+# Number of files kept in memory (and in the JSON/HTML reports) from the
+# listing; the complete listing is only written to file_listing.csv
+FILE_PREVIEW_LIMIT = 100
+
+# Buffer size for output files written incrementally (timeline, listings);
+# large buffers keep the write syscall count down on multi-GB images
+WRITE_BUFSIZE = 1 << 20
+
+# Banner line around the full analysis output
+_SEP = "=" * 60
+
+# Default cap on the size of each report file; 0 or None means no cap
+MAX_REPORT_BYTES = 512 << 20
+
+# Pipe buffer size for Sleuth Kit output; scaled from the image size when
+# it is known, since a tiny image produces little output and a multi-GB one
+# produces a lot
+READ_BUFSIZE = 1 << 20
+SMALL_IMAGE_READ_BUFSIZE = 64 << 10
+LARGE_IMAGE_READ_BUFSIZE = 4 << 20
+SMALL_IMAGE_BYTES = 256 << 20
+LARGE_IMAGE_BYTES = 2 << 30
+
+# Approximate size of each batch of lines handed from the pipe reader thread
+# to the parser, and how many batches may be queued ahead of it
+READ_BATCH_BYTES = 1 << 18
+READ_BATCH_QUEUE = 4
+
+# Columns produced by _parse_mmls_output
+PARTITION_FIELDS = ["slot", "start", "end", "length", "description"]
+
+
+class FileEntry:
+    """A single file record from the fls listing"""
+    
+    __slots__ = FLS_FIELDS
+    
+    def __init__(self, type, inode, name, mode, uid, gid, size, atime, mtime, ctime=""):
+        self.type = type
+        self.inode = inode
+        self.name = name
+        self.mode = mode
+        self.uid = uid
+        self.gid = gid
+        self.size = size
+        self.atime = atime
+        self.mtime = mtime
+        self.ctime = ctime
+    
+    def as_dict(self):
+        """Return the record as a plain dict (for JSON output)"""
+        return {field: getattr(self, field) for field in FLS_FIELDS}
+
+
+def _print_line(message):
+    """print() for messages from analyzers and report writers on worker threads
+    
+    print() writes the text and the newline separately, so two threads can
+    end up on one line; a single write keeps each message whole.
+    """
+    sys.stdout.write(message + "\n")
+
+
+def _read_bufsize(size_hint):
+    """Pick the pipe buffer size for an image of size_hint bytes (None if unknown)"""
+    if size_hint is None:
+        return READ_BUFSIZE
+    if size_hint < SMALL_IMAGE_BYTES:
+        return SMALL_IMAGE_READ_BUFSIZE
+    if size_hint >= LARGE_IMAGE_BYTES:
+        return LARGE_IMAGE_READ_BUFSIZE
+    return READ_BUFSIZE
+
+
+def _iter_batches(stream):
+    """Yield lists of lines from stream, read ahead on a background thread
     
-    def run_command(self, cmd):
-        """Execute a shell command and return output"""
+    Reading the pipe and parsing what came out of it overlap: the reader
+    thread keeps pulling lines while the caller is still busy with the
+    previous batch, with a bounded queue between them.
+    """
+    batches = queue.Queue(maxsize=READ_BATCH_QUEUE)
+    stop = threading.Event()
+    
+    def reader():
         try:
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
-            return result.stdout, result.stderr, result.returncode
-        except subprocess.TimeoutExpired:
-            return "", "Command timed out", -1
+            while not stop.is_set():
+                batch = stream.readlines(READ_BATCH_BYTES)
+                while not stop.is_set():
+                    try:
+                        batches.put(batch, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if not batch:
+                    return
         except Exception as e:
-            return "", str(e), -1
-    
-    def analyze_filesystem(self):
-        """Analyze filesystem structure using fsstat"""
-        print("[*] Analyzing filesystem structure...")
-        cmd = f"fsstat {self.image_path}"
-        stdout, stderr, code = self.run_command(cmd)
-        
-        if code == 0:
-            self.results["artifacts"]["filesystem_info"] = {
-                "raw_output": stdout,
-                "status": "success"
-            }
-            self._save_text_output("filesystem_info.txt", stdout)
-            print("[✓] Filesystem analysis complete")
-        else:
-            print(f"[✗] Filesystem analysis failed: {stderr}")
-            self.results["artifacts"]["filesystem_info"] = {
-                "status": "failed",
-                "error": stderr
-            }
-        
-        return stdout
+            batches.put(e)
     
-    def list_files(self, recursive=True):
-        """List all files using fls"""
-        print("[*] Extracting file listing...")
-        flag = "-r" if recursive else ""
-        cmd = f"fls {flag} -m / {self.image_path}"
-        stdout, stderr, code = self.run_command(cmd)
-        
-        # Check for high entropy warnings in stderr
-        if stderr and "high entropy" in stderr.lower():
-            print("[!] Note: High entropy/encrypted files detected (this is informational)")
-            self.results["warnings"] = self.results.get("warnings", [])
-            self.results["warnings"].append("High entropy files detected - may indicate encryption or compression")
-        
-        if code == 0:
-            files = self._parse_fls_output(stdout)
-            self.results["artifacts"]["file_listing"] = {
-                "total_files": len(files),
-                "files": files,
-                "status": "success"
-            }
-            self._save_csv_output("file_listing.csv", files)
-            print(f"[✓] Found {len(files)} files")
-        else:
-            print(f"[✗] File listing failed: {stderr}")
-            self.results["artifacts"]["file_listing"] = {
-                "status": "failed",
-                "error": stderr
-            }
-        
-        return files if code == 0 else []
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = batches.get()
+            if isinstance(batch, Exception):
+                raise batch
+            if not batch:
+                return
+            yield batch
+    finally:
+        # Lets the reader exit if the caller gave up early
+        stop.set()
+
+
+def _json_default(obj):
+    """json.dump hook for record types that aren't plain dicts"""
+    if isinstance(obj, FileEntry):
+        return obj.as_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ReportTruncated(Exception):
+    """Raised by _CappedWriter when a report reaches its size limit
     
-    def _parse_fls_output(self, output):
-        """Parse fls output into structured data"""
-        files = []
-        for line in output.strip().split('\n'):
-            if not line or line.startswith('#'):
-                continue
-            parts = line.split('|')
-            if len(parts) >= 10:
-                files.append({
-                    "type": parts[1],
-                    "inode": parts[2],
-                    "name": parts[3],
-                    "mode": parts[4],
-                    "uid": parts[5],
-                    "gid": parts[6],
-                    "size": parts[7],
-                    "atime": parts[8],
-                    "mtime": parts[9],
-                    "ctime": parts[10] if len(parts) > 10 else ""
-                })
-        return files
+    closed is set once a partly written JSON container has been closed off,
+    so the enclosing container knows the element is there.
+    """
     
-    def analyze_file_metadata(self, inode):
-        """Get detailed metadata for a specific file using istat"""
-        print(f"[*] Analyzing metadata for inode {inode}...")
-        cmd = f"istat {self.image_path} {inode}"
-        stdout, stderr, code = self.run_command(cmd)
-        
-        if code == 0:
-            print(f"[✓] Metadata extracted for inode {inode}")
-            return stdout
-        else:
-            print(f"[✗] Metadata extraction failed: {stderr}")
-            return None
+    def __init__(self):
+        super().__init__("report size limit reached")
+        self.closed = False
+
+
+class _CappedWriter:
+    """Wrap a file so a report stops at a size limit
     
-    def extract_deleted_files(self):
-        """Find deleted files"""
-        print("[*] Searching for deleted files...")
-        cmd = f"fls -r -d {self.image_path}"
-        stdout, stderr, code = self.run_command(cmd)
-        
-        if code == 0:
-            deleted_files = [line for line in stdout.split('\n') if line.strip()]
-            
-            # Categorize deleted files by recoverability
-            recoverable = []
-            realloc_warning = []
-            
-            for file_entry in deleted_files:
-                if '(realloc)' in file_entry:
-                    realloc_warning.append(file_entry)
-                else:
-                    recoverable.append(file_entry)
-            
-            self.results["artifacts"]["deleted_files"] = {
-                "count": len(deleted_files),
-                "recoverable_count": len(recoverable),
-                "realloc_count": len(realloc_warning),
-                "files": deleted_files,
-                "recoverable": recoverable,
-                "realloc_warning": realloc_warning,
-                "status": "success"
-            }
-            
-            self._save_text_output("deleted_files.txt", stdout)
-            
-            # Save categorized deleted files
-            if recoverable:
-                self._save_text_output("deleted_files_recoverable.txt", '\n'.join(recoverable))
-            if realloc_warning:
-                self._save_text_output("deleted_files_realloc.txt", '\n'.join(realloc_warning))
-            
-            print(f"[✓] Found {len(deleted_files)} deleted files")
-            print(f"    ├─ {len(recoverable)} potentially recoverable")
-            print(f"    └─ {len(realloc_warning)} with reallocation warnings (may be overwritten)")
-        else:
-            print(f"[✗] Deleted file search failed: {stderr}")
-            self.results["artifacts"]["deleted_files"] = {
-                "status": "failed",
-                "error": stderr
-            }
-        
-        return deleted_files if code == 0 else []
+    A write that would go past limit raises ReportTruncated without writing
+    anything. After that every write goes through so the caller can close
+    off what it started and add a truncation marker. The limit is counted in
+    characters for text files, which is close enough for the HTML report.
+    """
     
-    def create_timeline(self):
-        """Generate filesystem timeline using fls"""
-        print("[*] Creating filesystem timeline...")
-        cmd = f"fls -r -m / {self.image_path}"
-        stdout, stderr, code = self.run_command(cmd)
-        
-        if code == 0:
-            timeline_entries = stdout.strip().split('\n')
-            self.results["artifacts"]["timeline"] = {
-                "entries": len(timeline_entries),
-                "status": "success"
-            }
-            self._save_text_output("timeline.txt", stdout)
-            print(f"[✓] Timeline created with {len(timeline_entries)} entries")
-        else:
-            print(f"[✗] Timeline creation failed: {stderr}")
-            self.results["artifacts"]["timeline"] = {
-                "status": "failed",
-                "error": stderr
-            }
+    def __init__(self, f, limit, written=0):
+        self._write = f.write
+        self.limit = limit
+        self.written = written
+        self.truncated = False
     
-    def analyze_partitions(self):
-        """Analyze disk partitions using mmls"""
-        print("[*] Analyzing disk partitions...")
-        cmd = f"mmls {self.image_path}"
-        stdout, stderr, code = self.run_command(cmd)
-        
-        if code == 0:
-            partitions = self._parse_mmls_output(stdout)
-            self.results["artifacts"]["partitions"] = {
-                "count": len(partitions),
-                "partitions": partitions,
-                "status": "success"
-            }
-            self._save_csv_output("partitions.csv", partitions)
-            print(f"[✓] Found {len(partitions)} partitions")
-        else:
-            print(f"[✗] Partition analysis failed: {stderr}")
-            self.results["artifacts"]["partitions"] = {
-                "status": "failed",
-                "error": stderr
-            }
+    def write(self, data):
+        if not self.truncated:
+            if self.written + len(data) > self.limit:
+                self.truncated = True
+                raise ReportTruncated()
+            self.written += len(data)
+        return self._write(data)
     
-    def _parse_mmls_output(self, output):
-        """Parse mmls output into structured data"""
-        partitions = []
-        lines = output.strip().split('\n')
+    def writelines(self, lines):
         for line in lines:
-            if line.startswith('0') or not line[0].isdigit():
-                continue
-            parts = line.split()
-            if len(parts) >= 6:
-                partitions.append({
-                    "slot": parts[0],
-                    "start": parts[1],
-                    "end": parts[2],
-                    "length": parts[3],
-                    "description": ' '.join(parts[4:])
-                })
-        return partitions
+            self.write(line)
+
+
+def _dumps_compact(obj):
+    """Encode obj as compact JSON bytes"""
+    orjson = _load_orjson()
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default)
+    return json.dumps(obj, separators=(',', ':'), default=_json_default).encode()
+
+
+def _write_json_streamed(obj, write, depth=4, prefix=b''):
+    """Write obj as compact JSON, encoding dicts and lists piece by piece
     
-    def recover_file(self, inode, output_filename):
-        """Recover a file by inode using icat"""
-        print(f"[*] Recovering file inode {inode}...")
-        output_path = self.output_dir / "recovered" / output_filename
-        output_path.parent.mkdir(exist_ok=True)
-        
-        cmd = f"icat {self.image_path} {inode} > {output_path}"
-        stdout, stderr, code = self.run_command(cmd)
-        
-        if code == 0:
-            print(f"[✓] File recovered to {output_path}")
-            return str(output_path)
-        else:
-            print(f"[✗] File recovery failed: {stderr}")
-            return None
+    Containers in the top depth levels of the report are written one
+    element at a time, so the large lists (deleted files, for one) are
+    never encoded into a single string. Anything deeper is encoded whole.
     
-    def _save_text_output(self, filename, content):
-        """Save text output to file"""
-        filepath = self.output_dir / f"{self.timestamp}_{filename}"
-        with open(filepath, 'w') as f:
-            f.write(content)
+    Each element goes out in one write together with the separator and key
+    before it (prefix). If write raises ReportTruncated, every container
+    already opened is closed and each cut dict gets "truncated": true, so
+    the output is still valid JSON.
+    """
+    if depth and isinstance(obj, dict):
+        write(prefix + b'{')
+        wrote = False
+        try:
+            for key, value in obj.items():
+                item_prefix = (b',' if wrote else b'') + _dumps_compact(key) + b':'
+                _write_json_streamed(value, write, depth - 1, item_prefix)
+                wrote = True
+            write(b'}')
+        except ReportTruncated as e:
+            write(b',"truncated":true}' if wrote or e.closed else b'"truncated":true}')
+            e.closed = True
+            raise
+    elif depth and isinstance(obj, list):
+        write(prefix + b'[')
+        try:
+            for i, item in enumerate(obj):
+                _write_json_streamed(item, write, depth - 1, b',' if i else b'')
+            write(b']')
+        except ReportTruncated as e:
+            write(b']')
+            e.closed = True
+            raise
+    else:
+        write(prefix + _dumps_compact(obj))
+
+
+class ReportSink:
+    """Context manager returned by ForensicToolkit.reporting()
     
-    def _save_csv_output(self, filename, data):
-        """Save data as CSV"""
-        if not data:
-            return
-        filepath = self.output_dir / f"{self.timestamp}_{filename}"
-        with open(filepath, 'w', newline='') as f:
-            if isinstance(data[0], dict):
-                writer = csv.DictWriter(f, fieldnames=data[0].keys())
-                writer.writeheader()
-                writer.writerows(data)
-    
-    def save_json_report(self):
-        """Save complete analysis results as JSON"""
-        filepath = self.output_dir / f"{self.timestamp}_forensic_report.json"
-        with open(filepath, 'w') as f:
-            json.dump(self.results, f, indent=2)
-        print(f"\n[✓] JSON report saved to {filepath}")
+    Analysis runs inside the with block. On a clean exit the JSON report
+    and (if html is set) the HTML report are written from the collected
+    results, and html_path holds the HTML report path (None if skipped).
+    Nothing is written if the block raises.
+    """
     
-    def generate_html_report(self):
-        """Generate a professional HTML report"""
-        filepath = self.output_dir / f"{self.timestamp}_forensic_report.html"
-        
-        html_content = self._build_html_report()
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        print(f"[✓] HTML report saved to {filepath}")
-        return filepath
+    def __init__(self, toolkit, html, **options):
+        self.toolkit = toolkit
+        self.html = html
+        self.options = options
+        self.html_path = None
     
-    def _build_html_report(self):
-        """Build the HTML report content"""
-        # Get summary statistics
-        total_files = self.results.get("artifacts", {}).get("file_listing", {}).get("total_files", 0)
-        deleted_count = self.results.get("artifacts", {}).get("deleted_files", {}).get("count", 0)
-        recoverable_count = self.results.get("artifacts", {}).get("deleted_files", {}).get("recoverable_count", 0)
-        realloc_count = self.results.get("artifacts", {}).get("deleted_files", {}).get("realloc_count", 0)
-        partition_count = self.results.get("artifacts", {}).get("partitions", {}).get("count", 0)
-        timeline_entries = self.results.get("artifacts", {}).get("timeline", {}).get("entries", 0)
-        
-        # Get file listing
-        files = self.results.get("artifacts", {}).get("file_listing", {}).get("files", [])
-        
-        # Get partitions
-        partitions = self.results.get("artifacts", {}).get("partitions", {}).get("partitions", [])
-        
-        # Get filesystem info
-        fs_info = self.results.get("artifacts", {}).get("filesystem_info", {}).get("raw_output", "N/A")
-        
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Forensic Analysis Report</title>
-    <style>
-        * {{
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.html_path = self.toolkit.save_reports(generate_html=self.html, **self.options)
+        return False
+
+# Static stylesheet for the HTML report
+HTML_STYLE = """    <style>
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        body {{
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             padding: 20px;
             line-height: 1.6;
-        }}
+        }
         
-        .container {{
+        .container {
             max-width: 1400px;
             margin: 0 auto;
             background: white;
             border-radius: 15px;
             box-shadow: 0 20px 60px rgba(0,0,0,0.3);
             overflow: hidden;
-        }}
+        }
         
-        .header {{
+        .header {
             background: linear-gradient(135deg, #2d3748 0%, #1a202c 100%);
             color: white;
             padding: 40px;
             text-align: center;
-        }}
+        }
         
-        .header h1 {{
+        .header h1 {
             font-size: 2.5em;
             margin-bottom: 10px;
             text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-        }}
+        }
         
-        .header .subtitle {{
+        .header .subtitle {
             font-size: 1.1em;
             opacity: 0.9;
             margin-top: 10px;
-        }}
+        }
         
-        .meta-info {{
+        .meta-info {
             background: #f7fafc;
             padding: 25px 40px;
             border-bottom: 3px solid #e2e8f0;
-        }}
+        }
         
-        .meta-info p {{
+        .meta-info p {
             margin: 8px 0;
             color: #4a5568;
             font-size: 0.95em;
-        }}
+        }
         
-        .meta-info strong {{
+        .meta-info strong {
             color: #2d3748;
             font-weight: 600;
-        }}
+        }
         
-        .content {{
+        .content {
             padding: 40px;
-        }}
+        }
         
-        .summary-cards {{
+        .summary-cards {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
             gap: 20px;
             margin-bottom: 40px;
-        }}
+        }
         
-        .card {{
+        .card {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 25px;
             border-radius: 12px;
             box-shadow: 0 4px 15px rgba(0,0,0,0.1);
             transition: transform 0.3s ease, box-shadow 0.3s ease;
-        }}
+        }
         
-        .card:hover {{
+        .card:hover {
             transform: translateY(-5px);
             box-shadow: 0 8px 25px rgba(0,0,0,0.2);
-        }}
+        }
         
-        .card h3 {{
+        .card h3 {
             font-size: 0.9em;
             opacity: 0.9;
             margin-bottom: 10px;
             text-transform: uppercase;
             letter-spacing: 1px;
-        }}
+        }
         
-        .card .number {{
+        .card .number {
             font-size: 3em;
             font-weight: bold;
             text-shadow: 2px 2px 4px rgba(0,0,0,0.2);
-        }}
+        }
         
-        .card.success {{
+        .card.success {
             background: linear-gradient(135deg, #48bb78 0%, #38a169 100%);
-        }}
+        }
         
-        .card.warning {{
+        .card.warning {
             background: linear-gradient(135deg, #ed8936 0%, #dd6b20 100%);
-        }}
+        }
         
-        .card.info {{
+        .card.info {
             background: linear-gradient(135deg, #4299e1 0%, #3182ce 100%);
-        }}
+        }
         
-        .section {{
+        .section {
             margin-bottom: 40px;
-        }}
+        }
         
-        .section h2 {{
+        .section h2 {
             color: #2d3748;
             font-size: 1.8em;
             margin-bottom: 20px;
@@ -440,78 +396,78 @@ class ForensicToolkit:
             border-bottom: 3px solid #667eea;
             display: flex;
             align-items: center;
-        }}
+        }
         
-        .section h2::before {{
+        .section h2::before {
             content: "▶";
             margin-right: 10px;
             color: #667eea;
-        }}
+        }
         
-        .table-container {{
+        .table-container {
             overflow-x: auto;
             background: white;
             border-radius: 8px;
             box-shadow: 0 2px 10px rgba(0,0,0,0.08);
-        }}
+        }
         
-        table {{
+        table {
             width: 100%;
             border-collapse: collapse;
             font-size: 0.9em;
-        }}
+        }
         
-        thead {{
+        thead {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
-        }}
+        }
         
-        thead th {{
+        thead th {
             padding: 15px;
             text-align: left;
             font-weight: 600;
             text-transform: uppercase;
             font-size: 0.85em;
             letter-spacing: 0.5px;
-        }}
+        }
         
-        tbody tr {{
+        tbody tr {
             border-bottom: 1px solid #e2e8f0;
             transition: background-color 0.2s ease;
-        }}
+        }
         
-        tbody tr:hover {{
+        tbody tr:hover {
             background-color: #f7fafc;
-        }}
+        }
         
-        tbody td {{
+        tbody td {
             padding: 12px 15px;
             color: #4a5568;
-        }}
+        }
         
-        tbody tr:nth-child(even) {{
+        tbody tr:nth-child(even) {
             background-color: #fafafa;
-        }}
+        }
         
-        .badge {{
+        .badge {
             display: inline-block;
             padding: 4px 12px;
             border-radius: 20px;
             font-size: 0.85em;
             font-weight: 600;
-        }}
+        }
         
-        .badge.success {{
+        .badge.success {
             background: #c6f6d5;
             color: #22543d;
-        }}
+        }
         
-        .badge.error {{
+        .badge.error {
             background: #fed7d7;
             color: #742a2a;
-        }}
+        }
         
-        .code-block {{
+        .code-block {
             background: #2d3748;
             color: #e2e8f0;
             padding: 20px;
@@ -523,52 +479,61 @@ class ForensicToolkit:
             white-space: pre-wrap;
             word-wrap: break-word;
             box-shadow: inset 0 2px 10px rgba(0,0,0,0.3);
-        }}
+        }
         
-        .footer {{
+        .footer {
             background: #f7fafc;
             padding: 30px;
             text-align: center;
             color: #718096;
             border-top: 3px solid #e2e8f0;
-        }}
+        }
         
-        .footer p {{
+        .footer p {
             margin: 5px 0;
-        }}
+        }
         
-        .no-data {{
+        .no-data {
             text-align: center;
             padding: 40px;
             color: #a0aec0;
             font-style: italic;
-        }}
+        }
         
-        .pagination-info {{
+        .pagination-info {
             margin-top: 20px;
             padding: 15px;
             background: #edf2f7;
             border-radius: 8px;
             text-align: center;
             color: #4a5568;
-        }}
+        }
         
-        @media print {{
-            body {{
+        @media print {
+            body {
                 background: white;
                 padding: 0;
-            }}
+            }
             
-            .container {{
+            .container {
                 box-shadow: none;
-            }}
+            }
             
-            .card {{
+            .card {
                 break-inside: avoid;
-            }}
-        }}
+            }
+        }
     </style>
-</head>
+"""
+
+# Static document head, stylesheet included; written as-is
+HTML_HEADER = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Forensic Analysis Report</title>
+""" + HTML_STYLE + """</head>
 <body>
     <div class="container">
         <div class="header">
@@ -576,11 +541,14 @@ class ForensicToolkit:
             <p class="subtitle">Automated Forensic Toolkit - Powered by Sleuth Kit</p>
         </div>
         
-        <div class="meta-info">
-            <p><strong>Analysis Date:</strong> {self.results.get('analysis_date', 'N/A')}</p>
-            <p><strong>Image Analyzed:</strong> {self.results.get('image_analyzed', 'N/A')}</p>
-            <p><strong>Output Directory:</strong> {self.output_dir}</p>
-            <p><strong>Report Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+"""
+
+# Parameterized report fragments, filled in with str.format
+REPORT_SUMMARY_TMPL = """        <div class="meta-info">
+            <p><strong>Analysis Date:</strong> {analysis_date}</p>
+            <p><strong>Image Analyzed:</strong> {image_analyzed}</p>
+            <p><strong>Output Directory:</strong> {output_dir}</p>
+            <p><strong>Report Generated:</strong> {generated}</p>
         </div>
         
         <div class="content">
@@ -606,7 +574,9 @@ class ForensicToolkit:
                 </div>
             </div>
             
-            {f'''
+"""
+
+DELETED_SECTION_TMPL = """
             <div class="section">
                 <h2>Deleted Files Recovery Analysis</h2>
                 <div class="table-container">
@@ -650,12 +620,726 @@ class ForensicToolkit:
                     </p>
                 </div>
             </div>
-            ''' if deleted_count > 0 else ''}
+            """
+
+STATUS_ROW_TMPL = """
+                            <tr>
+                                <td><strong>{module}</strong></td>
+                                <td><span class="badge {badge_class}">{status}</span></td>
+                                <td>{details}</td>
+                            </tr>
+"""
+
+HTML_FOOTER_TMPL = """
+        </div>
+        
+        <div class="footer">
+            <p><strong>Automated Forensic Toolkit v1.0</strong></p>
+            <p>Powered by Sleuth Kit | Generated by Ford, Olsen, Trojan</p>
+            <p>Report generated on {report_date}</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+# Closes off an HTML report that hit the size cap, ahead of the footer
+HTML_TRUNCATED_TMPL = """
+            <div class="section">
+                <div class="pagination-info">
+                    Report truncated at {limit:,} bytes. Re-run with a larger
+                    --max-report-bytes to see the rest.
+                </div>
+            </div>
+"""
+
+# Per-row templates for the HTML report tables; string fields must be
+# passed through _esc, numeric fields (sector counts, inodes, sizes,
+# timestamps) come from Sleuth Kit as digits and are used as-is
+PARTITION_ROW_TMPL = """
+                            <tr>
+                                <td>{slot}</td>
+                                <td>{start}</td>
+                                <td>{end}</td>
+                                <td>{length}</td>
+                                <td>{description}</td>
+                            </tr>
 """
 
+FILE_ROW_TMPL = """
+                            <tr>
+                                <td>{type}</td>
+                                <td>{inode}</td>
+                                <td style="word-break: break-all;">{name}</td>
+                                <td>{size}</td>
+                                <td>{mtime}</td>
+                                <td><code>{mode}</code></td>
+                            </tr>
+"""
+
+
+
+class ForensicToolkit:
+    """Main class for the automated forensic toolkit"""
+    
+    def __init__(self, image_path, output_dir="forensic_output", size_hint=None,
+                 max_report_bytes=MAX_REPORT_BYTES):
+        self.image_path = image_path
+        # Image size in bytes if the caller already stat'ed it, else None
+        self.size_hint = size_hint
+        self.read_bufsize = _read_bufsize(size_hint)
+        self.max_report_bytes = max_report_bytes
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(exist_ok=True)
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.results = {
+            "analysis_date": datetime.now().isoformat(),
+            "image_analyzed": str(image_path),
+            "artifacts": {}
+        }
+        self._results_lock = threading.Lock()
+        
+        # The recursive fls -m walk feeds both list_files and create_timeline.
+        # timeline.txt is only written when a timeline is wanted:
+        # create_timeline asks for it and run_full_analysis sets
+        # _fls_timeline_wanted so list_files' walk covers both.
+        self._fls_cache = None
+        self._fls_cache_has_timeline = False
+        self._fls_timeline_wanted = False
+        self._fls_lock = threading.Lock()
+    
+    def _record_artifact(self, name, data):
+        """Store an artifact result (safe to call from worker threads)"""
+        with self._results_lock:
+            self.results["artifacts"][name] = data
+    
+    def _add_warning(self, message):
+        """Append a warning to the results (safe to call from worker threads)"""
+        with self._results_lock:
+            self.results.setdefault("warnings", []).append(message)
+    
+    def run_command(self, cmd, stdout=subprocess.PIPE):
+        """Execute a command (an argument list, no shell) and return output"""
+        try:
+            result = subprocess.run(
+                cmd,
+                stdout=stdout,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=300
+            )
+            return result.stdout or "", result.stderr, result.returncode
+        except subprocess.TimeoutExpired:
+            return "", "Command timed out", -1
+        except Exception as e:
+            return "", str(e), -1
+    
+    def run_command_piped(self, cmd, consume, timeout=300):
+        """Execute a command and hand its stdout pipe (a binary file) to consume
+        
+        Lets a caller drain the whole output in one tight loop rather than
+        paying for a callback per line. Returns (stderr, returncode).
+        """
+        try:
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=self.read_bufsize
+            )
+        except Exception as e:
+            return str(e), -1
+        
+        # Drain stderr on the side so a chatty tool can't fill the pipe and stall
+        stderr_chunks = []
+        stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()))
+        stderr_reader.start()
+        
+        timed_out = threading.Event()
+        def kill():
+            timed_out.set()
+            proc.kill()
+        watchdog = threading.Timer(timeout, kill)
+        watchdog.start()
+        
+        try:
+            consume(proc.stdout)
+            proc.wait()
+        except Exception as e:
+            proc.kill()
+            proc.wait()
+            return str(e), -1
+        finally:
+            watchdog.cancel()
+            stderr_reader.join()
+            proc.stdout.close()
+            proc.stderr.close()
+        
+        if timed_out.is_set():
+            return "Command timed out", -1
+        return b"".join(stderr_chunks).decode("utf-8", "replace"), proc.returncode
+    
+    def prefetch_image(self, chunk_size=1024 * 1024):
+        """Warm the page cache by reading the whole image in a background thread
+        
+        The Sleuth Kit tools read the image with small synchronous reads; on a
+        cold cache a sequential read-ahead lets them hit memory instead of disk.
+        Where posix_fadvise exists the kernel is asked to do the read-ahead
+        itself (SEQUENTIAL, then WILLNEED) instead of copying every chunk.
+        """
+        print("[*] Prefetching image into the page cache...")
+        
+        def read_ahead():
+            try:
+                with open(self.image_path, 'rb', buffering=0) as f:
+                    if hasattr(os, "posix_fadvise"):
+                        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                        return
+                    buf = bytearray(chunk_size)
+                    while f.readinto(buf):
+                        pass
+            except OSError:
+                pass  # purely an optimization; the analysis reads the image itself
+        
+        thread = threading.Thread(target=read_ahead, daemon=True)
+        thread.start()
+        return thread
+    
+    def release_image_cache(self):
+        """Ask the kernel to drop the image from the page cache
+        
+        Frees memory after a large image has been analyzed. Does nothing
+        where posix_fadvise isn't available.
+        """
+        if not hasattr(os, "posix_fadvise"):
+            return
+        try:
+            with open(self.image_path, 'rb', buffering=0) as f:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass  # only a hint; the analysis results are unaffected
+    
+    def analyze_filesystem(self):
+        """Analyze filesystem structure using fsstat"""
+        _print_line("[*] Analyzing filesystem structure...")
+        cmd = ["fsstat", str(self.image_path)]
+        stdout, stderr, code = self.run_command(cmd)
+        
+        if code == 0:
+            self._record_artifact("filesystem_info", {
+                "raw_output": stdout,
+                "status": "success"
+            })
+            self._save_text_output("filesystem_info.txt", stdout)
+            _print_line("[✓] Filesystem analysis complete")
+        else:
+            _print_line(f"[✗] Filesystem analysis failed: {stderr}")
+            self._record_artifact("filesystem_info", {
+                "status": "failed",
+                "error": stderr
+            })
+        
+        return stdout
+    
+    def list_files(self, recursive=True):
+        """List all files using fls
+        
+        The full listing is written to file_listing.csv; only the first
+        FILE_PREVIEW_LIMIT entries are kept in memory and returned. Use
+        load_full_listing() to iterate over every file.
+        """
+        _print_line("[*] Extracting file listing...")
+        if recursive:
+            walk = self._fls_full_walk()
+        else:
+            walk = self._fls_walk(recursive=False, write_timeline=False)
+        files = walk["files"]
+        stderr = walk["stderr"]
+        code = walk["code"]
+        
+        # Check for high entropy warnings in stderr
+        if stderr and "high entropy" in stderr.lower():
+            _print_line("[!] Note: High entropy/encrypted files detected (this is informational)")
+            self._add_warning("High entropy files detected - may indicate encryption or compression")
+        
+        if code == 0:
+            self._record_artifact("file_listing", {
+                "total_files": walk["total_files"],
+                "files": files,
+                "files_csv": str(self._output_path("file_listing.csv")),
+                "status": "success"
+            })
+            _print_line(f"[✓] Found {walk['total_files']} files")
+        else:
+            _print_line(f"[✗] File listing failed: {stderr}")
+            self._record_artifact("file_listing", {
+                "status": "failed",
+                "error": stderr
+            })
+        
+        return files if code == 0 else []
+    
+    def _fls_full_walk(self, timeline=False):
+        """Run the recursive fls -m walk once and share it between list_files and create_timeline
+        
+        The walk also writes timeline.txt if timeline is set or a full
+        analysis is running. A cached walk without it is redone when a
+        timeline is asked for later.
+        """
+        with self._fls_lock:
+            timeline = timeline or self._fls_timeline_wanted
+            if self._fls_cache is None or (timeline and not self._fls_cache_has_timeline):
+                self._fls_cache = self._fls_walk(recursive=True, write_timeline=timeline)
+                self._fls_cache_has_timeline = timeline
+            return self._fls_cache
+    
+    def _fls_walk(self, recursive, write_timeline):
+        """Run fls -m, writing file_listing.csv (and timeline.txt) in one pass over its output"""
+        flags = ["-r"] if recursive else []
+        cmd = ["fls", *flags, "-m", "/", str(self.image_path)]
+        
+        # Parse and write the CSV as batches of lines arrive instead of
+        # buffering stdout. Rows go straight from the split fields to the CSV
+        # writer; FileEntry objects are only built for the preview kept in memory.
+        files = []
+        total_files = 0
+        timeline_entries = 0
+        f, writer = self._open_csv_writer("file_listing.csv", FLS_FIELDS)
+        timeline = self._open_output("timeline.txt", mode='wb') if write_timeline else nullcontext()
+        with f, timeline:
+            def consume(stdout):
+                nonlocal total_files, timeline_entries
+                parse = self._parse_fls_line
+                for batch in _iter_batches(stdout):
+                    if write_timeline:
+                        timeline.writelines(batch)
+                        timeline_entries += len(batch)
+                    rows = [fields for fields in map(parse, batch) if fields is not None]
+                    writer.writerows(rows)
+                    total_files += len(rows)
+                    if len(files) < FILE_PREVIEW_LIMIT:
+                        files.extend(FileEntry(*fields) for fields in rows[:FILE_PREVIEW_LIMIT - len(files)])
+            
+            stderr, code = self.run_command_piped(cmd, consume)
+        
+        # A failed run leaves nothing behind that looks like real output
+        if code != 0:
+            self._remove_outputs("file_listing.csv")
+            if write_timeline:
+                self._remove_outputs("timeline.txt")
+        
+        return {
+            "files": files,
+            "total_files": total_files,
+            "timeline_entries": timeline_entries,
+            "stderr": stderr,
+            "code": code
+        }
+    
+    def load_full_listing(self):
+        """Iterate over every FileEntry in the file_listing.csv written by list_files"""
+        with open(self._output_path("file_listing.csv"), newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            for row in reader:
+                yield FileEntry(*row)
+    
+    def _parse_fls_line(self, line):
+        """Parse a single (bytes) line of fls output into a list of FLS_FIELDS values
+        
+        Returns None if the line isn't a file entry.
+        """
+        # Decode once per line; maxsplit stops after the last field we use.
+        # Blank, comment and other malformed lines never have enough fields,
+        # so the length check is the only filter needed.
+        parts = line.rstrip(b'\r\n').decode("utf-8", "replace").split('|', 10)
+        if len(parts) < 10:
+            return None
+        fields = parts[1:11]
+        if len(fields) < len(FLS_FIELDS):
+            fields.append("")  # no ctime column
+        return fields
+    
+    def analyze_file_metadata(self, inode):
+        """Get detailed metadata for a specific file using istat"""
+        print(f"[*] Analyzing metadata for inode {inode}...")
+        cmd = ["istat", str(self.image_path), str(inode)]
+        stdout, stderr, code = self.run_command(cmd)
+        
+        if code == 0:
+            print(f"[✓] Metadata extracted for inode {inode}")
+            return stdout
+        else:
+            print(f"[✗] Metadata extraction failed: {stderr}")
+            return None
+    
+    def extract_deleted_files(self):
+        """Find deleted files"""
+        _print_line("[*] Searching for deleted files...")
+        cmd = ["fls", "-r", "-d", str(self.image_path)]
+        
+        # Write the raw output and categorize each entry by recoverability in
+        # a single pass over the fls output
+        deleted_files = []
+        recoverable = []
+        realloc_warning = []
+        with self._open_output("deleted_files.txt", mode='wb') as all_out, \
+                self._open_output("deleted_files_recoverable.txt", mode='wb') as recoverable_out, \
+                self._open_output("deleted_files_realloc.txt", mode='wb') as realloc_out:
+            def consume(stdout):
+                for line in stdout:
+                    all_out.write(line)
+                    if not line.strip():
+                        continue
+                    file_entry = line.rstrip(b'\r\n').decode("utf-8", "replace")
+                    deleted_files.append(file_entry)
+                    if b'(realloc)' in line:
+                        realloc_warning.append(file_entry)
+                        realloc_out.write(line)
+                    else:
+                        recoverable.append(file_entry)
+                        recoverable_out.write(line)
+            
+            stderr, code = self.run_command_piped(cmd, consume)
+        
+        # Only keep the categorized files that have something in them, and
+        # none of the partial output if fls failed
+        if code != 0:
+            self._remove_outputs("deleted_files.txt", "deleted_files_recoverable.txt", "deleted_files_realloc.txt")
+        else:
+            if not recoverable:
+                self._remove_outputs("deleted_files_recoverable.txt")
+            if not realloc_warning:
+                self._remove_outputs("deleted_files_realloc.txt")
+        
+        if code == 0:
+            self._record_artifact("deleted_files", {
+                "count": len(deleted_files),
+                "recoverable_count": len(recoverable),
+                "realloc_count": len(realloc_warning),
+                "files": deleted_files,
+                "recoverable": recoverable,
+                "realloc_warning": realloc_warning,
+                "status": "success"
+            })
+            
+            _print_line(
+                f"[✓] Found {len(deleted_files)} deleted files\n"
+                f"    ├─ {len(recoverable)} potentially recoverable\n"
+                f"    └─ {len(realloc_warning)} with reallocation warnings (may be overwritten)"
+            )
+        else:
+            _print_line(f"[✗] Deleted file search failed: {stderr}")
+            self._record_artifact("deleted_files", {
+                "status": "failed",
+                "error": stderr
+            })
+        
+        return deleted_files if code == 0 else []
+    
+    def create_timeline(self):
+        """Generate filesystem timeline using fls"""
+        _print_line("[*] Creating filesystem timeline...")
+        walk = self._fls_full_walk(timeline=True)
+        entries = walk["timeline_entries"]
+        stderr = walk["stderr"]
+        code = walk["code"]
+        
+        if code == 0:
+            self._record_artifact("timeline", {
+                "entries": entries,
+                "status": "success"
+            })
+            _print_line(f"[✓] Timeline created with {entries} entries")
+        else:
+            _print_line(f"[✗] Timeline creation failed: {stderr}")
+            self._record_artifact("timeline", {
+                "status": "failed",
+                "error": stderr
+            })
+    
+    def analyze_partitions(self):
+        """Analyze disk partitions using mmls"""
+        _print_line("[*] Analyzing disk partitions...")
+        cmd = ["mmls", str(self.image_path)]
+        stdout, stderr, code = self.run_command(cmd)
+        
+        if code == 0:
+            partitions = self._parse_mmls_output(stdout)
+            self._record_artifact("partitions", {
+                "count": len(partitions),
+                "partitions": partitions,
+                "status": "success"
+            })
+            if partitions:
+                f, writer = self._open_csv_writer("partitions.csv", PARTITION_FIELDS)
+                with f:
+                    writer.writerows(
+                        tuple(partition[field] for field in PARTITION_FIELDS)
+                        for partition in partitions
+                    )
+            _print_line(f"[✓] Found {len(partitions)} partitions")
+        else:
+            _print_line(f"[✗] Partition analysis failed: {stderr}")
+            self._record_artifact("partitions", {
+                "status": "failed",
+                "error": stderr
+            })
+    
+    def _parse_mmls_output(self, output):
+        """Parse mmls output into structured data"""
+        partitions = []
+        lines = output.strip().split('\n')
+        for line in lines:
+            if line.startswith('0') or not line[0].isdigit():
+                continue
+            parts = line.split()
+            if len(parts) >= 6:
+                partitions.append({
+                    "slot": parts[0],
+                    "start": parts[1],
+                    "end": parts[2],
+                    "length": parts[3],
+                    "description": ' '.join(parts[4:])
+                })
+        return partitions
+    
+    def recover_file(self, inode, output_filename):
+        """Recover a file by inode using icat"""
+        print(f"[*] Recovering file inode {inode}...")
+        output_path = self.output_dir / "recovered" / output_filename
+        output_path.parent.mkdir(exist_ok=True)
+        
+        cmd = ["icat", str(self.image_path), str(inode)]
+        try:
+            with open(output_path, 'wb') as f:
+                stdout, stderr, code = self.run_command(cmd, stdout=f)
+        except OSError as e:
+            stdout, stderr, code = "", str(e), -1
+        
+        if code == 0:
+            print(f"[✓] File recovered to {output_path}")
+            return str(output_path)
+        else:
+            print(f"[✗] File recovery failed: {stderr}")
+            return None
+    
+    def _output_path(self, filename):
+        """Return the timestamped path for an output file"""
+        return self.output_dir / f"{self.timestamp}_{filename}"
+    
+    def _remove_outputs(self, *filenames):
+        """Delete timestamped output files written by this run"""
+        for filename in filenames:
+            self._output_path(filename).unlink()
+    
+    def _open_output(self, filename, mode='w', newline=None):
+        """Open a timestamped output file for incremental writing"""
+        return open(self._output_path(filename), mode, buffering=WRITE_BUFSIZE, newline=newline)
+    
+    def _save_text_output(self, filename, content):
+        """Save text output to file"""
+        with self._open_output(filename) as f:
+            f.write(content)
+    
+    def _open_csv_writer(self, filename, fieldnames):
+        """Open a timestamped CSV file and write its header row
+        
+        Returns (file_handle, csv.writer); the caller writes rows as tuples
+        in fieldnames order and is responsible for closing the file.
+        """
+        f = self._open_output(filename, newline='')
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        return f, writer
+    
+    def _capped(self, f, written=0):
+        """Wrap a report file in a _CappedWriter unless there is no size cap
+        
+        written is what already went to f and counts towards the cap.
+        """
+        if not self.max_report_bytes:
+            return f
+        return _CappedWriter(f, self.max_report_bytes, written)
+    
+    def _report_truncated(self, filepath):
+        """Note that a report was cut off at max_report_bytes"""
+        _print_line(f"[!] Report {filepath} truncated at {self.max_report_bytes:,} bytes (see --max-report-bytes)")
+    
+    def save_json_report(self, pretty=False):
+        """Save complete analysis results as JSON (indented if pretty is set)
+        
+        Every form of the report ends with a newline. The compact report is
+        cut off at max_report_bytes; the pretty one is encoded in one piece
+        and is not capped.
+        """
+        filepath = self._output_path("forensic_report.json")
+        orjson = _load_orjson()
+        if not pretty:
+            with open(filepath, 'wb', buffering=WRITE_BUFSIZE) as f:
+                out = self._capped(f)
+                try:
+                    _write_json_streamed(self.results, out.write)
+                except ReportTruncated:
+                    # Not even the opening brace fit under the cap
+                    if not out.written:
+                        f.write(b'{"truncated":true}')
+                    self._report_truncated(filepath)
+                f.write(b'\n')
+        elif orjson is not None:
+            option = orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+            with open(filepath, 'wb', buffering=WRITE_BUFSIZE) as f:
+                f.write(orjson.dumps(self.results, default=_json_default, option=option))
+        else:
+            with open(filepath, 'w', buffering=WRITE_BUFSIZE) as f:
+                json.dump(self.results, f, indent=2, default=_json_default)
+                f.write('\n')
+        _print_line(f"\n[✓] JSON report saved to {filepath}")
+    
+    def save_ndjson_report(self, stream=None):
+        """Save analysis results as newline-delimited JSON records
+        
+        The first record holds the report metadata. Each artifact is a record
+        of its scalar fields followed by one record per element of its lists,
+        so consumers can process the report line by line as it is written.
+        Goes to stream (a binary file) if given, else forensic_report.ndjson.
+        """
+        if stream is not None:
+            self._write_ndjson(stream, "<stdout>")
+            stream.flush()
+            return
+        
+        filepath = self._output_path("forensic_report.ndjson")
+        with open(filepath, 'wb', buffering=WRITE_BUFSIZE) as f:
+            self._write_ndjson(f, filepath)
+        _print_line(f"\n[✓] NDJSON report saved to {filepath}")
+    
+    def _write_ndjson(self, f, name):
+        """Write the NDJSON records for save_ndjson_report to f
+        
+        If the report reaches max_report_bytes it ends with a truncated record.
+        """
+        try:
+            self._write_ndjson_records(self._capped(f).write)
+        except ReportTruncated:
+            f.write(b'{"record":"truncated"}\n')
+            self._report_truncated(name)
+    
+    def _write_ndjson_records(self, write):
+        """Write one line per NDJSON record"""
+        def write_record(record):
+            write(_dumps_compact(record) + b'\n')
+        
+        meta = {key: value for key, value in self.results.items() if not isinstance(value, (dict, list))}
+        write_record({"record": "report", **meta})
+        
+        for name, data in self.results.get("artifacts", {}).items():
+            write_record({
+                "record": "artifact",
+                "artifact": name,
+                **{key: value for key, value in data.items() if not isinstance(value, list)}
+            })
+            for key, value in data.items():
+                if isinstance(value, list):
+                    for item in value:
+                        write_record({"record": "item", "artifact": name, "field": key, "value": item})
+        
+        for message in self.results.get("warnings", []):
+            write_record({"record": "warning", "message": message})
+    
+    def save_reports(self, generate_html=True, pretty_json=False, ndjson=False, stream=None):
+        """Write the JSON report and, if requested, the HTML report side by side
+        
+        Both only read self.results, so the HTML is written while the JSON
+        report is still flushing. With ndjson set the JSON report is written
+        as NDJSON, to stream if one is given. Returns the HTML report path, or
+        None if it was skipped.
+        """
+        if ndjson:
+            save_json = functools.partial(self.save_ndjson_report, stream)
+        else:
+            save_json = functools.partial(self.save_json_report, pretty=pretty_json)
+        
+        if not generate_html:
+            save_json()
+            return None
+        
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            json_future = executor.submit(save_json)
+            html_future = executor.submit(self.generate_html_report)
+            json_future.result()
+            return html_future.result()
+    
+    def reporting(self, html=True, pretty_json=False, ndjson=False, stream=None):
+        """Return a ReportSink that writes the reports when its with block ends
+        
+        with toolkit.reporting(html=True):
+            toolkit.list_files()
+        """
+        return ReportSink(self, html, pretty_json=pretty_json, ndjson=ndjson, stream=stream)
+    
+    def generate_html_report(self):
+        """Generate a professional HTML report"""
+        filepath = self._output_path("forensic_report.html")
+        
+        with open(filepath, 'w', encoding='utf-8', buffering=WRITE_BUFSIZE) as f:
+            # The head and styles go out whatever the cap, so a report cut
+            # off early still renders
+            f.write(HTML_HEADER)
+            try:
+                self._write_html_report(self._capped(f, len(HTML_HEADER)))
+            except ReportTruncated:
+                f.write(HTML_TRUNCATED_TMPL.format(limit=self.max_report_bytes))
+                f.write(HTML_FOOTER_TMPL.format(
+                    report_date=datetime.now().strftime('%B %d, %Y at %H:%M:%S')
+                ))
+                self._report_truncated(filepath)
+        
+        _print_line(f"[✓] HTML report saved to {filepath}")
+        return filepath
+    
+    def _write_html_report(self, f):
+        """Write the HTML report body to f section by section, after HTML_HEADER"""
+        # Get summary statistics
+        total_files = self.results.get("artifacts", {}).get("file_listing", {}).get("total_files", 0)
+        deleted_count = self.results.get("artifacts", {}).get("deleted_files", {}).get("count", 0)
+        recoverable_count = self.results.get("artifacts", {}).get("deleted_files", {}).get("recoverable_count", 0)
+        realloc_count = self.results.get("artifacts", {}).get("deleted_files", {}).get("realloc_count", 0)
+        partition_count = self.results.get("artifacts", {}).get("partitions", {}).get("count", 0)
+        timeline_entries = self.results.get("artifacts", {}).get("timeline", {}).get("entries", 0)
+        
+        # Get file listing
+        files = self.results.get("artifacts", {}).get("file_listing", {}).get("files", [])
+        
+        # Get partitions
+        partitions = self.results.get("artifacts", {}).get("partitions", {}).get("partitions", [])
+        
+        # Get filesystem info
+        fs_info = self.results.get("artifacts", {}).get("filesystem_info", {}).get("raw_output", "N/A")
+        
+        write = f.write
+        write(REPORT_SUMMARY_TMPL.format(
+            analysis_date=self.results.get('analysis_date', 'N/A'),
+            image_analyzed=_esc(self.results.get('image_analyzed', 'N/A')),
+            output_dir=_esc(str(self.output_dir)),
+            generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            total_files=total_files,
+            deleted_count=deleted_count,
+            partition_count=partition_count,
+            timeline_entries=timeline_entries
+        ))
+        if deleted_count > 0:
+            write(DELETED_SECTION_TMPL.format(
+                deleted_count=deleted_count,
+                recoverable_count=recoverable_count,
+                realloc_count=realloc_count
+            ))
+
         # Partition Information
         if partitions:
-            html += """
+            write("""
             <div class="section">
                 <h2>Disk Partitions</h2>
                 <div class="table-container">
@@ -670,36 +1354,31 @@ class ForensicToolkit:
                             </tr>
                         </thead>
                         <tbody>
-"""
-            for partition in partitions:
-                html += f"""
-                            <tr>
-                                <td>{partition.get('slot', 'N/A')}</td>
-                                <td>{partition.get('start', 'N/A')}</td>
-                                <td>{partition.get('end', 'N/A')}</td>
-                                <td>{partition.get('length', 'N/A')}</td>
-                                <td>{partition.get('description', 'N/A')}</td>
-                            </tr>
-"""
-            html += """
+""")
+            render_row = PARTITION_ROW_TMPL.format_map
+            f.writelines(
+                render_row({**partition, "description": _esc(partition["description"])})
+                for partition in partitions
+            )
+            write("""
                         </tbody>
                     </table>
                 </div>
             </div>
-"""
+""")
 
         # Filesystem Information
-        html += f"""
+        write(f"""
             <div class="section">
                 <h2>Filesystem Information</h2>
-                <div class="code-block">{fs_info[:2000] if fs_info != "N/A" else "No filesystem information available"}</div>
+                <div class="code-block">{_esc(fs_info[:2000]) if fs_info != "N/A" else "No filesystem information available"}</div>
             </div>
-"""
+""")
 
-        # File Listing (show first 100 files)
+        # File Listing (only the preview is kept in memory)
         if files:
-            display_files = files[:100]
-            html += f"""
+            display_files = files[:FILE_PREVIEW_LIMIT]
+            write("""
             <div class="section">
                 <h2>File Listing</h2>
                 <div class="table-container">
@@ -715,36 +1394,37 @@ class ForensicToolkit:
                             </tr>
                         </thead>
                         <tbody>
-"""
-            for file in display_files:
-                html += f"""
-                            <tr>
-                                <td>{file.get('type', 'N/A')}</td>
-                                <td>{file.get('inode', 'N/A')}</td>
-                                <td style="word-break: break-all;">{file.get('name', 'N/A')}</td>
-                                <td>{file.get('size', 'N/A')}</td>
-                                <td>{file.get('mtime', 'N/A')}</td>
-                                <td><code>{file.get('mode', 'N/A')}</code></td>
-                            </tr>
-"""
-            html += """
+""")
+            render_row = FILE_ROW_TMPL.format
+            f.writelines(
+                render_row(
+                    type=_esc(file.type),
+                    inode=file.inode,
+                    name=_esc(file.name),
+                    size=file.size,
+                    mtime=file.mtime,
+                    mode=_esc(file.mode)
+                )
+                for file in display_files
+            )
+            write("""
                         </tbody>
                     </table>
                 </div>
-"""
-            if len(files) > 100:
-                html += f"""
+""")
+            if total_files > len(display_files):
+                write(f"""
                 <div class="pagination-info">
-                    Showing first 100 of {len(files):,} files. 
+                    Showing first {len(display_files)} of {total_files:,} files. 
                     See the CSV export for the complete file listing.
                 </div>
-"""
-            html += """
+""")
+            write("""
             </div>
-"""
+""")
 
         # Analysis Status Summary
-        html += """
+        write("""
             <div class="section">
                 <h2>Analysis Module Status</h2>
                 <div class="table-container">
@@ -757,7 +1437,7 @@ class ForensicToolkit:
                             </tr>
                         </thead>
                         <tbody>
-"""
+""")
         
         artifacts = self.results.get("artifacts", {})
         for module_name, module_data in artifacts.items():
@@ -775,136 +1455,265 @@ class ForensicToolkit:
                     details.append(f"{module_data['entries']:,} entries")
                 detail_str = ", ".join(details) if details else "Completed"
                 
-                html += f"""
-                            <tr>
-                                <td><strong>{module_name.replace('_', ' ').title()}</strong></td>
-                                <td><span class="badge {badge_class}">{status.upper()}</span></td>
-                                <td>{detail_str}</td>
-                            </tr>
-"""
-        
-        html += """
+                write(STATUS_ROW_TMPL.format(
+                    module=module_name.replace('_', ' ').title(),
+                    badge_class=badge_class,
+                    status=status.upper(),
+                    details=detail_str
+                ))
+        
+        write("""
                         </tbody>
                     </table>
                 </div>
             </div>
-"""
+""")
 
         # Footer
-        html += f"""
-        </div>
-        
-        <div class="footer">
-            <p><strong>Automated Forensic Toolkit v1.0</strong></p>
-            <p>Powered by Sleuth Kit | Generated by Ford, Olsen, Trojan</p>
-            <p>Report generated on {datetime.now().strftime('%B %d, %Y at %H:%M:%S')}</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-        return html
+        write(HTML_FOOTER_TMPL.format(
+            report_date=datetime.now().strftime('%B %d, %Y at %H:%M:%S')
+        ))
     
-    def run_full_analysis(self, generate_html=True):
-        """Execute complete forensic analysis workflow"""
-        print(f"\n{'='*60}")
+    def run_full_analysis(self, generate_html=True, pretty_json=False, ndjson=False, stream=None,
+                          threads=None):
+        """Execute complete forensic analysis workflow
+        
+        threads caps how many analysis modules run at once (default: all).
+        """
+        print(f"\n{_SEP}")
         print(f"Automated Forensic Analysis Starting")
         print(f"Image: {self.image_path}")
         print(f"Output Directory: {self.output_dir}")
-        print(f"{'='*60}\n")
-        
-        # Run all analysis modules
-        self.analyze_partitions()
-        self.analyze_filesystem()
-        self.list_files()
-        self.extract_deleted_files()
-        self.create_timeline()
-        
-        # Save comprehensive reports
-        self.save_json_report()
-        
-        if generate_html:
-            print()
-            html_path = self.generate_html_report()
-            print(f"\n[i] Open the HTML report in your browser:")
-            print(f"    file://{html_path.absolute()}")
-        
-        print(f"\n{'='*60}")
-        print(f"Analysis Complete!")
-        print(f"{'='*60}\n")
+        print(f"{_SEP}\n")
+        
+        # list_files and create_timeline share one fls walk, whichever starts it
+        self._fls_timeline_wanted = True
+        
+        # Comprehensive reports are saved when the block ends
+        with self.reporting(html=generate_html, pretty_json=pretty_json, ndjson=ndjson, stream=stream) as sink:
+            # Run all analysis modules concurrently - each one mostly waits on
+            # its own Sleuth Kit process, so total time is bounded by the slowest
+            from concurrent.futures import ThreadPoolExecutor, as_completed
+            modules = [
+                self.analyze_partitions,
+                self.analyze_filesystem,
+                self.list_files,
+                self.extract_deleted_files,
+                self.create_timeline
+            ]
+            with ThreadPoolExecutor(max_workers=min(threads or len(modules), len(modules))) as executor:
+                futures = [executor.submit(module) for module in modules]
+                for future in as_completed(futures):
+                    future.result()
+            
+            # Keep artifacts in module order rather than completion order so the
+            # reports come out the same from run to run
+            order = ["partitions", "filesystem_info", "file_listing", "deleted_files", "timeline"]
+            self.results["artifacts"] = dict(sorted(
+                self.results["artifacts"].items(),
+                key=lambda item: order.index(item[0]) if item[0] in order else len(order)
+            ))
+        
+        # Closing banner goes out in one write
+        link = ""
+        if sink.html_path is not None:
+            link = f"\n[i] Open the HTML report in your browser:\n    file://{sink.html_path.resolve()}\n"
+        sys.stdout.write(f"{link}\n{_SEP}\nAnalysis Complete!\n{_SEP}\n\n")
+
+
+# Single-module runs for -m/--module; "full" goes through run_full_analysis
+DISPATCH = {
+    "filesystem": ForensicToolkit.analyze_filesystem,
+    "files": ForensicToolkit.list_files,
+    "deleted": ForensicToolkit.extract_deleted_files,
+    "timeline": ForensicToolkit.create_timeline,
+    "partitions": ForensicToolkit.analyze_partitions
+}
+
+# Valid -m/--module values, in the order shown in --help
+MODULE_NAMES = ("full", *DISPATCH)
+_MODULES = frozenset(MODULE_NAMES)
+
+
+def _image_arg(value):
+    """argparse type for the image: returns (path, os.stat result)
+    
+    Rejects missing or unreadable paths and anything that is not a regular
+    file or block device before any analysis starts.
+    """
+    import argparse
+    try:
+        st = os.stat(value)
+    except FileNotFoundError:
+        raise argparse.ArgumentTypeError(f"Image file '{value}' not found")
+    except OSError as e:
+        raise argparse.ArgumentTypeError(f"Cannot access image file '{value}': {e.strerror}")
+    if not (stat.S_ISREG(st.st_mode) or stat.S_ISBLK(st.st_mode)):
+        raise argparse.ArgumentTypeError(f"'{value}' is not a regular file or block device")
+    return value, st
+
 
+def _positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    import argparse
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
 
-def main():
+
+def _non_negative_int(value):
+    """argparse type for sizes and limits where 0 means no limit"""
+    import argparse
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {value!r}")
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {number}")
+    return number
+
+
+def _module_arg(value):
+    """argparse type for -m/--module: a set lookup instead of a choices list scan"""
+    if value not in _MODULES:
+        import argparse
+        choices = ", ".join(repr(name) for name in MODULE_NAMES)
+        raise argparse.ArgumentTypeError(f"invalid choice: {value!r} (choose from {choices})")
+    return value
+
+
+@functools.lru_cache(maxsize=1)
+def _build_parser():
+    """Build the command line parser once and reuse it across main() calls"""
+    # Only loaded when running as a script, not when the toolkit is imported
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description="Automated Forensic Toolkit using Sleuth Kit"
     )
     parser.add_argument(
         "image",
+        type=_image_arg,
         help="Path to disk image file"
     )
     parser.add_argument(
         "-o", "--output",
         default="forensic_output",
-        help="Output directory (default: forensic_output)"
+        help="Output directory (default: forensic_output); '-' streams the report "
+             "to stdout as NDJSON and keeps the other files in forensic_output"
     )
     parser.add_argument(
         "-m", "--module",
-        choices=["full", "filesystem", "files", "deleted", "timeline", "partitions"],
+        type=_module_arg,
+        metavar="{" + ",".join(MODULE_NAMES) + "}",
         default="full",
         help="Analysis module to run (default: full)"
     )
+    # --html/--no-html share one attribute; None means "use the module default"
     parser.add_argument(
         "--html",
+        dest="html",
         action="store_true",
+        default=None,
         help="Generate HTML report (default: True for full analysis)"
     )
     parser.add_argument(
         "--no-html",
-        action="store_true",
+        dest="html",
+        action="store_false",
         help="Skip HTML report generation"
     )
+    parser.add_argument(
+        "--pretty-json",
+        action="store_true",
+        help="Indent the JSON report for reading (slower on large images)"
+    )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Write the report as newline-delimited JSON records for streaming consumers"
+    )
+    parser.add_argument(
+        "--max-report-bytes",
+        type=_non_negative_int,
+        default=MAX_REPORT_BYTES,
+        help=f"Cut each report off at this many bytes, 0 for no limit (default: {MAX_REPORT_BYTES})"
+    )
+    parser.add_argument(
+        "--threads",
+        type=_positive_int,
+        default=None,
+        metavar="N",
+        help="Run at most N analysis modules at once in a full analysis (default: all of them)"
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Read the image ahead in the background to warm the page cache"
+    )
+    parser.add_argument(
+        "--drop-cache",
+        action="store_true",
+        help="Drop the image from the page cache when the analysis finishes"
+    )
+    
+    return parser
+
+
+def main(argv=None):
+    args = _build_parser().parse_args(argv)
+    
+    # With -o - the report goes to stdout, so progress messages go to stderr.
+    # The stream gets the same 1 MiB buffer as the report files rather than
+    # the default 8 KiB one used for a pipe
+    report_stream = None
+    if args.output == "-":
+        sys.stdout.flush()
+        report_stream = open(sys.stdout.fileno(), 'wb', buffering=WRITE_BUFSIZE, closefd=False)
+        args.output = "forensic_output"
+    ndjson = args.ndjson or report_stream is not None
+    
+    # The image was stat'ed once while parsing; its size goes to the toolkit
+    image_path, st = args.image
     
-    args = parser.parse_args()
-    
-    # Check if image exists
-    if not os.path.exists(args.image):
-        print(f"[✗] Error: Image file '{args.image}' not found")
-        sys.exit(1)
-    
-    # Initialize toolkit
-    toolkit = ForensicToolkit(args.image, args.output)
-    
-    # Determine if HTML should be generated
-    generate_html = args.html or (args.module == "full" and not args.no_html)
-    
-    # Run selected analysis
-    if args.module == "full":
-        toolkit.run_full_analysis(generate_html=generate_html)
-    elif args.module == "filesystem":
-        toolkit.analyze_filesystem()
-        toolkit.save_json_report()
-        if generate_html:
-            toolkit.generate_html_report()
-    elif args.module == "files":
-        toolkit.list_files()
-        toolkit.save_json_report()
-        if generate_html:
-            toolkit.generate_html_report()
-    elif args.module == "deleted":
-        toolkit.extract_deleted_files()
-        toolkit.save_json_report()
-        if generate_html:
-            toolkit.generate_html_report()
-    elif args.module == "timeline":
-        toolkit.create_timeline()
-        toolkit.save_json_report()
-        if generate_html:
-            toolkit.generate_html_report()
-    elif args.module == "partitions":
-        toolkit.analyze_partitions()
-        toolkit.save_json_report()
-        if generate_html:
-            toolkit.generate_html_report()
+    with redirect_stdout(sys.stderr) if report_stream is not None else nullcontext():
+        # Initialize toolkit
+        toolkit = ForensicToolkit(
+            image_path,
+            args.output,
+            size_hint=st.st_size,
+            max_report_bytes=args.max_report_bytes
+        )
+        if args.prefetch:
+            toolkit.prefetch_image()
+        
+        # Determine if HTML should be generated
+        generate_html = args.html if args.html is not None else args.module == "full"
+        
+        # Run selected analysis
+        if args.module == "full":
+            toolkit.run_full_analysis(
+                generate_html=generate_html,
+                pretty_json=args.pretty_json,
+                ndjson=ndjson,
+                stream=report_stream,
+                threads=args.threads
+            )
+        else:
+            with toolkit.reporting(
+                html=generate_html,
+                pretty_json=args.pretty_json,
+                ndjson=ndjson,
+                stream=report_stream
+            ):
+                DISPATCH[args.module](toolkit)
+        
+        if args.drop_cache:
+            toolkit.release_image_cache()
 
 
 if __name__ == "__main__":
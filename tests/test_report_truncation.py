@@ -0,0 +1,113 @@
+"""
+Checks that reports cut off by --max-report-bytes are still well formed
+Run with: python -m unittest discover tests
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import forensic_toolkit2_HTML as toolkit_module
+
+
+def sample_results():
+    """A report shaped like a full analysis, small enough to try every limit"""
+    return {
+        "analysis_date": "2024-01-01T00:00:00",
+        "image_analyzed": "image.dd",
+        "artifacts": {
+            "partitions": {
+                "count": 1,
+                "partitions": [{"slot": "002", "start": "2048", "end": "4095",
+                                "length": "2048", "description": "Linux (0x83)"}],
+                "status": "success"
+            },
+            "filesystem_info": {"raw_output": "FILE SYSTEM INFORMATION\n", "status": "success"},
+            "file_listing": {
+                "total_files": 2,
+                "files": [
+                    toolkit_module.FileEntry("0", "/etc/passwd", "12", "r/rrw-r--r--", "0", "0", "1024", "1", "2", "3"),
+                    toolkit_module.FileEntry("0", "/etc/<shadow>", "13", "r/rrw-------", "0", "0", "512", "1", "2")
+                ],
+                "status": "success"
+            },
+            "deleted_files": {
+                "count": 2,
+                "recoverable_count": 1,
+                "realloc_count": 1,
+                "files": ["r/r * 20: old.txt", "r/r * 21(realloc): gone.txt"],
+                "recoverable": ["r/r * 20: old.txt"],
+                "realloc_warning": ["r/r * 21(realloc): gone.txt"],
+                "status": "success"
+            },
+            "timeline": {"status": "failed", "error": "fls: command not found"}
+        },
+        "warnings": ["High entropy data detected"]
+    }
+
+
+class ReportTruncationTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.toolkit = toolkit_module.ForensicToolkit("image.dd", self._tmp.name)
+        self.toolkit.results = sample_results()
+
+    def _report(self, name, write_report, limit):
+        self.toolkit.max_report_bytes = limit
+        for path in Path(self._tmp.name).glob("*"):
+            path.unlink()
+        with mock.patch("sys.stdout"):
+            write_report()
+        (path,) = Path(self._tmp.name).glob(f"*_{name}")
+        return path.read_bytes()
+
+    def _check_every_limit(self, name, write_report, check):
+        full_size = len(self._report(name, write_report, 0))
+        for limit in range(1, full_size + 2):
+            with self.subTest(limit=limit):
+                check(self._report(name, write_report, limit))
+
+    def _check_json(self, data):
+        json.loads(data)
+
+    def test_json_report_stays_valid_with_orjson(self):
+        if toolkit_module._load_orjson() is None:
+            self.skipTest("orjson is not installed")
+        self._check_every_limit("forensic_report.json", self.toolkit.save_json_report, self._check_json)
+
+    def test_json_report_stays_valid_with_stdlib_json(self):
+        with mock.patch.object(toolkit_module, "_load_orjson", return_value=None):
+            self._check_every_limit("forensic_report.json", self.toolkit.save_json_report, self._check_json)
+
+    def test_truncated_json_report_is_marked(self):
+        data = json.loads(self._report("forensic_report.json", self.toolkit.save_json_report, 300))
+        self.assertIs(data["truncated"], True)
+
+    def test_ndjson_report_stays_valid(self):
+        def check(data):
+            records = [json.loads(line) for line in data.splitlines()]
+            if b'"record":"truncated"' in data:
+                self.assertEqual(records[-1], {"record": "truncated"})
+        self._check_every_limit("forensic_report.ndjson", self.toolkit.save_ndjson_report, check)
+
+    def test_html_report_keeps_header_and_footer(self):
+        def check(data):
+            text = data.decode("utf-8")
+            self.assertTrue(text.startswith("<!DOCTYPE html>"))
+            self.assertIn("<style>", text)
+            self.assertTrue(text.rstrip().endswith("</html>"))
+        full_size = len(self._report("forensic_report.html", self.toolkit.generate_html_report, 0))
+        for limit in (1, 100, len(toolkit_module.HTML_HEADER), 3000, full_size - 100, full_size + 1):
+            with self.subTest(limit=limit):
+                check(self._report("forensic_report.html", self.toolkit.generate_html_report, limit))
+
+
+if __name__ == "__main__":
+    unittest.main()